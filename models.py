@@ -1,7 +1,10 @@
-from sqlmodel import SQLModel, Field, Session, Relationship, create_engine, select
-from typing import Optional, List, Any, Union
-from pydantic import PrivateAttr
+from sqlmodel import SQLModel, Field, Session, Relationship, create_engine
+from sqlalchemy import Index, bindparam, update
+from typing import Optional, List, Any, Iterator, Callable
 from enum import Enum
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import dataclass, field
+from itertools import islice
 import json
 import simpy
 import uuid
@@ -19,6 +22,24 @@ class Patient(SQLModel, table=True):
     birthdate: datetime
 
 
+@dataclass(slots=True)
+class PractitionerState:
+    """Simulation state of a practitioner"""
+
+    env: Any
+    resource: Any
+    work_schedule: dict
+    # Work windows as sorted, non-overlapping minutes of the week
+    work_window_starts: list = field(default_factory=list)
+    work_window_ends: list = field(default_factory=list)
+    # Busy slots as (start, end, appointment id or "") tuples, sorted by start time
+    busy_slots: list = field(default_factory=list)
+    # Length of the longest busy slot, bounds how far back an overlap can start
+    max_busy_duration: int = 0
+    # Appointments the patient did not show up for, whose slots only block scheduling
+    no_show_ids: set = field(default_factory=set)
+
+
 class Practitioner(SQLModel, table=True):
     """Combined SQLModel and simulation Practitioner class"""
 
@@ -34,33 +55,46 @@ class Practitioner(SQLModel, table=True):
     # Relationships
     changes: List["Provenance"] = Relationship(back_populates="practitioner")
 
-    # Simulation-specific fields (not persisted in database)
-    _env: Any = PrivateAttr(default=None)
-    _resource: Any = PrivateAttr(default=None)
-    _work_schedule: Union[dict, None] = PrivateAttr(default=None)
-
     def __init__(self, env=None, work_schedule=None, **data):
         super().__init__(**data)
 
         # Handle simulation initialization
         if env is not None:
             self._init_simulation(env, work_schedule)
+        else:
+            object.__setattr__(self, "state", None)
 
     def _init_simulation(self, env, work_schedule):
         """Initialize simulation-specific components"""
-        self._env = env
-        self._resource = simpy.Resource(env, capacity=1)
-        self._work_schedule = work_schedule or {
-            i: [(9 * 60, 17 * 60)] for i in range(5)
-        }
+        # Simulation-specific fields (not persisted in database) live in a slotted
+        # sidecar object, which is set as a plain instance attribute, as reading
+        # pydantic private attributes is comparatively slow
+        work_schedule = work_schedule or {i: [(9 * 60, 17 * 60)] for i in range(5)}
+        work_windows = sorted(
+            (day * 24 * 60 + start, day * 24 * 60 + end)
+            for day, windows in work_schedule.items()
+            for start, end in windows
+        )
+        object.__setattr__(
+            self,
+            "state",
+            PractitionerState(
+                env=env,
+                resource=simpy.Resource(env, capacity=1),
+                work_schedule=work_schedule,
+                work_window_starts=[start for start, _ in work_windows],
+                work_window_ends=[end for _, end in work_windows],
+            ),
+        )
 
     # Simulation methods
     def is_within_working_hours(self, duration):
-        now = self._env.now
+        state = self.state
+        now = state.env.now
         weekday = int((now // (24 * 60)) % 7)
         minute_of_day = int(now % (24 * 60))
 
-        for start, end in self._work_schedule.get(weekday, []):
+        for start, end in state.work_schedule.get(weekday, []):
             if start <= minute_of_day <= end - duration:
                 return True
         return False
@@ -68,6 +102,100 @@ class Practitioner(SQLModel, table=True):
     def can_take_appointment(self, duration):
         return self.is_within_working_hours(duration)
 
+    def is_working(self, start: int, duration: int) -> bool:
+        """Check if the time period [start, start + duration) lies within a work window"""
+        state = self.state
+        minute_of_week = start % (7 * 24 * 60)
+        # Work windows do not overlap, so only the latest one starting at or before
+        # 'start' can contain the time period
+        i = bisect_right(state.work_window_starts, minute_of_week) - 1
+        return i >= 0 and minute_of_week + duration <= state.work_window_ends[i]
+
+    def next_working_time(self, start: int, duration: int) -> Optional[int]:
+        """Earliest time from 'start' on at which the practitioner works for 'duration' minutes"""
+        state = self.state
+        window_starts = state.work_window_starts
+        window_ends = state.work_window_ends
+        if not window_starts:
+            return None
+
+        week = 7 * 24 * 60
+        week_start = start - start % week
+        # Visit the work windows in order, beginning with the one 'start' falls in (or
+        # the latest one before it), until the same window comes around a week later
+        first = max(bisect_right(window_starts, start % week) - 1, 0)
+        for k in range(first, first + len(window_starts) + 1):
+            weeks, i = divmod(k, len(window_starts))
+            offset = week_start + weeks * week
+            slot_start = max(start, offset + window_starts[i])
+            if slot_start + duration <= offset + window_ends[i]:
+                return slot_start
+        # None of the work windows are long enough
+        return None
+
+    def record_busy_slot(self, start: int, end: int, appointment_id: str = ""):
+        """Keep track of a time slot in which the practitioner is busy"""
+        state = self.state
+        if end - start > state.max_busy_duration:
+            state.max_busy_duration = end - start
+
+        busy_slots = state.busy_slots
+        insort(busy_slots, (start, end, appointment_id))
+
+        # Drop slots that ended before any overlap check from now on can reach them
+        stale = bisect_left(busy_slots, (state.env.now - state.max_busy_duration,))
+        if stale:
+            if state.no_show_ids:
+                state.no_show_ids.difference_update(
+                    slot[2] for slot in busy_slots[:stale]
+                )
+            del busy_slots[:stale]
+
+    def release_busy_slot(
+        self, start: int, end: int, appointment_id: str, no_show: bool = False
+    ):
+        """Free up the slot of an appointment that is no longer booked"""
+        state = self.state
+        if no_show:
+            # The slot of a no-show still blocks new appointments from being scheduled
+            state.no_show_ids.add(appointment_id)
+            return
+
+        busy_slots = state.busy_slots
+        slot = (start, end, appointment_id)
+        i = bisect_left(busy_slots, slot)
+        if i < len(busy_slots) and busy_slots[i] == slot:
+            del busy_slots[i]
+
+    def is_busy(self, start: int, end: int) -> bool:
+        """Check if any busy slot overlaps the time period [start, end)"""
+        state = self.state
+        busy_slots = state.busy_slots
+        no_show_ids = state.no_show_ids
+        # Slots starting before 'start - max duration' have ended by 'start'
+        i = bisect_left(busy_slots, (start - state.max_busy_duration,))
+        # Iterate without copying the tail of the list, the scan usually stops early
+        for slot_start, slot_end, appointment_id in islice(busy_slots, i, None):
+            if slot_start >= end:
+                break
+            if slot_end > start and appointment_id not in no_show_ids:
+                return True
+        return False
+
+    def busy_slots_between(self, start: int, end: int) -> Iterator[tuple[int, int]]:
+        """Iterate over the (start, end) slots overlapping [start, end), including no-shows"""
+        state = self.state
+        busy_slots = state.busy_slots
+        # Slots starting before 'start - max duration' have ended by 'start'
+        i = bisect_left(busy_slots, (start - state.max_busy_duration,))
+        j = bisect_left(busy_slots, (end,), i)
+        # Slots are produced lazily, as the search for a free slot usually stops early
+        return (
+            (slot_start, slot_end)
+            for slot_start, slot_end, _ in islice(busy_slots, i, j)
+            if slot_end > start
+        )
+
     @property
     def name(self):
         """Get full name of the practitioner"""
@@ -76,15 +204,15 @@ class Practitioner(SQLModel, table=True):
     # Also provide access to simulation resources
     @property
     def env(self):
-        return self._env
+        return self.state.env
 
     @property
     def resource(self):
-        return self._resource
+        return self.state.resource
 
     @property
     def work_schedule(self):
-        return self._work_schedule
+        return self.state.work_schedule
 
 
 class Provenance(SQLModel, table=True):
@@ -95,7 +223,7 @@ class Provenance(SQLModel, table=True):
     recorded: int
     target_resource_type: str  # "Appointment", "Encounter", etc.
     target_resource_id: str  # ID of the affected resource
-    practitioner_id: int = Field(foreign_key="practitioner.id")
+    practitioner_id: str = Field(foreign_key="practitioner.id")
     practitioner: Practitioner = Relationship(back_populates="changes")
 
 
@@ -118,6 +246,16 @@ class AppointmentStatus(str, Enum):
 
 
 class Appointment(FHIRBase, table=True):
+    # Appointments are looked up by practitioner_id when export_data.py samples the
+    # patients of a practitioner
+    __table_args__ = (
+        Index(
+            "ix_appointment_practitioner_id_scheduled_start_time",
+            "practitioner_id",
+            "scheduled_start_time",
+        ),
+    )
+
     resource_type: str = "Appointment"
     created: int
     scheduled_start_time: int  # When it was scheduled to occur
@@ -135,6 +273,14 @@ class Appointment(FHIRBase, table=True):
 
 
 class Encounter(FHIRBase, table=True):
+    __table_args__ = (
+        Index(
+            "ix_encounter_practitioner_id_actual_start_time",
+            "practitioner_id",
+            "actual_start_time",
+        ),
+    )
+
     resource_type: str = "Encounter"
     appointment_id: str | None = Field(default=None, foreign_key="appointment.id")
     actual_start_time: int
@@ -150,6 +296,12 @@ class Encounter(FHIRBase, table=True):
 
 
 class Observation(FHIRBase, table=True):
+    __table_args__ = (
+        Index(
+            "ix_observation_practitioner_id_timestamp", "practitioner_id", "timestamp"
+        ),
+    )
+
     resource_type: str = "Observation"
     encounter_id: str | None = Field(default=None, foreign_key="encounter.id")
     code: str
@@ -202,17 +354,36 @@ class AuditEvent(FHIRBase, table=True):
 
 
 class ProvenanceTracker:
-    def __init__(self, engine):
+    def __init__(self, engine, session: Optional[Session] = None):
         self.engine = engine
+        # Long-lived session for persisting changes
+        self._session = (
+            session if session is not None else Session(engine, expire_on_commit=False)
+        )
 
-    def _get_practitioner(self, practitioner_id: str) -> Practitioner:
-        with Session(self.engine) as session:
-            practitioner = session.exec(
-                select(Practitioner).where(Practitioner.id == practitioner_id)
-            ).first()
-            if not practitioner:
-                raise ValueError("Practitioner not found")
-            return practitioner
+    def create_change(
+        self,
+        action: str,
+        target_resource_type: str,
+        target_resource_id: str,
+        recorded: int,
+        practitioner: Practitioner,
+        before: Optional[dict] = None,
+        after: Optional[dict] = None,
+    ) -> Provenance:
+        """Build a provenance entry without persisting it"""
+        return Provenance(
+            action=action,
+            target_resource_type=target_resource_type,
+            target_resource_id=target_resource_id,
+            practitioner_id=practitioner.id,
+            recorded=recorded,
+            details=(
+                json.dumps({"before": before, "after": after})
+                if before or after
+                else None
+            ),
+        )
 
     def log_change(
         self,
@@ -224,46 +395,131 @@ class ProvenanceTracker:
         before: Optional[dict] = None,
         after: Optional[dict] = None,
     ):
-        with Session(self.engine) as session:
-            prov = Provenance(
-                action=action,
-                target_resource_type=target_resource_type,
-                target_resource_id=target_resource_id,
-                practitioner_id=practitioner.id,
-                recorded=recorded,
-                details=(
-                    json.dumps({"before": before, "after": after})
-                    if before or after
-                    else None
-                ),
-            )
-            session.add(prov)
-            session.commit()
+        prov = self.create_change(
+            action=action,
+            target_resource_type=target_resource_type,
+            target_resource_id=target_resource_id,
+            recorded=recorded,
+            practitioner=practitioner,
+            before=before,
+            after=after,
+        )
+        self._session.add(prov)
+        self._session.commit()
 
 
 class FHIRLogger:
-    def __init__(self, provenance_tracker: ProvenanceTracker, engine):
+    def __init__(
+        self,
+        provenance_tracker: ProvenanceTracker,
+        engine,
+        new_id: Callable[[], str],
+        batch_size: int = 1000,
+        session: Optional[Session] = None,
+    ):
         self.provenance = provenance_tracker
         self.engine = engine
+        # Ids of logged resources are drawn from 'new_id', so that they are
+        # reproducible when it uses a seeded random number generator
+        self._new_id = new_id
+        # Long-lived session for reading back appointments logged elsewhere
+        self._session = (
+            session if session is not None else Session(engine, expire_on_commit=False)
+        )
+
+        # Resources are buffered and written to the database in batches instead of
+        # one transaction per event. Ids are assigned client-side, so the caller
+        # gets the id of a logged resource back without waiting for the insert.
+        self.batch_size = batch_size
+        # Pending rows grouped by table name
+        self._pending: dict[str, list[dict]] = {}
+        # Pending rows by resource id (so buffered resources can still be updated)
+        self._pending_by_id: dict[str, dict] = {}
+        # Pending status updates of appointments that have already been written
+        self._pending_status_updates: dict[str, dict] = {}
+        # Current state of appointments whose status may still change
+        self._appointment_states: dict[str, dict] = {}
+
+        # Statements are built once and reused by every flush, in an order in which
+        # rows never reference rows that have not been inserted yet
+        self._insert_statements = [
+            (table.name, table.insert()) for table in SQLModel.metadata.sorted_tables
+        ]
+        self._status_update_statement = (
+            update(Appointment.__table__)
+            .where(Appointment.__table__.c.id == bindparam("appointment_id"))
+            .values(
+                status=bindparam("new_status"),
+                cancellation_reason=bindparam("new_cancellation_reason"),
+            )
+        )
+
+    def _enqueue(self, table_name: str, row: dict) -> str:
+        """Buffer the row of a resource for insertion and return its id"""
+        self._pending.setdefault(table_name, []).append(row)
+        self._pending_by_id[row["id"]] = row
+
+        self._flush_if_full()
+        return row["id"]
+
+    def _flush_if_full(self):
+        if (
+            len(self._pending_by_id) + len(self._pending_status_updates)
+            >= self.batch_size
+        ):
+            self.flush()
+
+    def flush(self):
+        """Write all buffered resources and updates to the database in a single transaction"""
+        if not self._pending_by_id and not self._pending_status_updates:
+            return
+
+        with self.engine.begin() as connection:
+            for table_name, insert_statement in self._insert_statements:
+                rows = self._pending.get(table_name)
+                if rows:
+                    connection.execute(insert_statement, rows)
+
+            if self._pending_status_updates:
+                connection.execute(
+                    self._status_update_statement,
+                    [
+                        {
+                            "appointment_id": appointment_id,
+                            "new_status": state["status"],
+                            "new_cancellation_reason": state["cancellation_reason"],
+                        }
+                        for appointment_id, state in self._pending_status_updates.items()
+                    ],
+                )
+
+        self._pending.clear()
+        self._pending_by_id.clear()
+        self._pending_status_updates.clear()
 
     def _log_provenance(
         self,
         action: str,
         recorded: int,
-        resource: FHIRBase,
-        practitioner: Practitioner,
+        resource_type: str,
+        resource_id: str,
+        practitioner_id: str,
         before: Optional[dict] = None,
         after: Optional[dict] = None,
     ):
         """Log a provenance entry with before/after states"""
-        self.provenance.log_change(
-            action=action,
-            target_resource_type=resource.resource_type,
-            target_resource_id=resource.id,
-            practitioner=practitioner,
-            before=before,
-            after=after,
-            recorded=recorded,
+        # The before/after states are not part of the row, as the Provenance table
+        # has no column for them (see ProvenanceTracker.create_change)
+        self._enqueue(
+            Provenance.__table__.name,
+            {
+                "id": self._new_id(),
+                "action": action,
+                "recorded": recorded,
+                "target_resource_type": resource_type,
+                "target_resource_id": resource_id,
+                "practitioner_id": practitioner_id,
+            },
         )
 
     def log_appointment(
@@ -276,34 +532,37 @@ class FHIRLogger:
         scheduled_start_time: int,
         cancellation_reason: Optional[str] = None,
     ):
-        with Session(self.engine) as session:
-            # Get practitioner user
-            practitioner_object = self.provenance._get_practitioner(practitioner_id)
-
-            appointment = Appointment(
-                patient_id=patient_id,
-                created=created,
-                status=status,
-                practitioner_id=practitioner_id,
-                duration=duration,
-                scheduled_start_time=scheduled_start_time,
-                cancellation_reason=cancellation_reason,
-            )
-            session.add(appointment)
-            session.commit()
-            session.refresh(appointment)
-
-            # Log creation
-            self._log_provenance(
-                action="create",
-                recorded=created,
-                resource=appointment,
-                practitioner=practitioner_object,
-            )
+        appointment_id = self._enqueue(
+            Appointment.__table__.name,
+            {
+                "id": self._new_id(),
+                "resource_type": "Appointment",
+                "patient_id": patient_id,
+                "practitioner_id": practitioner_id,
+                "created": created,
+                "scheduled_start_time": scheduled_start_time,
+                "duration": duration,
+                "status": status,
+                "cancellation_reason": cancellation_reason,
+            },
+        )
+        self._appointment_states[appointment_id] = {
+            "status": status,
+            "cancellation_reason": cancellation_reason,
+        }
 
-            return appointment.id
+        # Log creation
+        self._log_provenance(
+            action="create",
+            recorded=created,
+            resource_type="Appointment",
+            resource_id=appointment_id,
+            practitioner_id=practitioner_id,
+        )
 
-    def update_appointment_status(
+        return appointment_id
+
+    def queue_status_update(
         self,
         appointment_id: str,
         new_status: AppointmentStatus,
@@ -311,41 +570,68 @@ class FHIRLogger:
         practitioner_id: str,
         reason: Optional[str] = None,
     ):
-        with Session(self.engine) as session:
-            appointment_object = session.get(Appointment, appointment_id)
+        """Update the status of an appointment with the next flush"""
+        # Get before state
+        state = self._appointment_states.get(appointment_id)
+        if state is None:
+            # The appointment was not logged by this logger, so read it back
+            self.flush()
+            appointment_object = self._session.get(Appointment, appointment_id)
+            self._session.commit()
             if not appointment_object:
                 raise ValueError("Appointment not found")
-
-            # Get before state
-            before_state = {
+            state = {
                 "status": appointment_object.status,
                 "cancellation_reason": appointment_object.cancellation_reason,
             }
+        before_state = dict(state)
+
+        # Update
+        state["status"] = new_status
+        if reason:
+            state["cancellation_reason"] = reason
+        after_state = dict(state)
+
+        pending_appointment = self._pending_by_id.get(appointment_id)
+        if pending_appointment is not None:
+            # The appointment has not been written yet, so update the buffered row
+            pending_appointment.update(after_state)
+        else:
+            self._pending_status_updates[appointment_id] = after_state
+
+        # Only booked appointments change status again
+        if new_status != AppointmentStatus.BOOKED:
+            self._appointment_states.pop(appointment_id, None)
+
+        # Log update
+        self._log_provenance(
+            action="update",
+            recorded=recorded,
+            resource_type="Appointment",
+            resource_id=appointment_id,
+            practitioner_id=practitioner_id,
+            before=before_state,
+            after=after_state,
+        )
+        self._flush_if_full()
 
-            # Update
-            appointment_object.status = new_status
-            if reason:
-                appointment_object.cancellation_reason = reason
-
-            # Get practitioner user
-            practitioner_object = self.provenance._get_practitioner(practitioner_id)
-
-            session.add(appointment_object)
-            session.commit()
-            session.refresh(appointment_object)
-
-            # Log update
-            self._log_provenance(
-                action="update",
-                recorded=recorded,
-                resource=appointment_object,
-                practitioner=practitioner_object,
-                before=before_state,
-                after={
-                    "status": appointment_object.status,
-                    "cancellation_reason": appointment_object.cancellation_reason,
-                },
-            )
+    def update_appointment_status(
+        self,
+        appointment_id: str,
+        new_status: AppointmentStatus,
+        recorded: int,
+        practitioner_id: str,
+        reason: Optional[str] = None,
+    ):
+        """Update the status of an appointment right away"""
+        self.queue_status_update(
+            appointment_id=appointment_id,
+            new_status=new_status,
+            recorded=recorded,
+            practitioner_id=practitioner_id,
+            reason=reason,
+        )
+        self.flush()
 
     def log_encounter(
         self,
@@ -355,17 +641,18 @@ class FHIRLogger:
         duration: int,
         appointment_id: Optional[str] = None,
     ):
-        with Session(self.engine) as session:
-            encounter = Encounter(
-                patient_id=patient_id,
-                practitioner_id=practitioner_id,
-                appointment_id=appointment_id,
-                actual_start_time=actual_start_time,
-                duration=duration,
-            )
-            session.add(encounter)
-            session.commit()
-            return encounter.id
+        return self._enqueue(
+            Encounter.__table__.name,
+            {
+                "id": self._new_id(),
+                "resource_type": "Encounter",
+                "patient_id": patient_id,
+                "practitioner_id": practitioner_id,
+                "appointment_id": appointment_id,
+                "actual_start_time": actual_start_time,
+                "duration": duration,
+            },
+        )
 
     def log_observation(
         self,
@@ -376,17 +663,19 @@ class FHIRLogger:
         value: Optional[str] = None,
         encounter_id: Optional[str] = None,
     ):
-        with Session(self.engine) as session:
-            obs = Observation(
-                patient_id=patient_id,
-                practitioner_id=practitioner_id,
-                timestamp=timestamp,
-                code=code,
-                value=value,
-                encounter_id=encounter_id,
-            )
-            session.add(obs)
-            session.commit()
+        return self._enqueue(
+            Observation.__table__.name,
+            {
+                "id": self._new_id(),
+                "resource_type": "Observation",
+                "patient_id": patient_id,
+                "practitioner_id": practitioner_id,
+                "encounter_id": encounter_id,
+                "code": code,
+                "value": value,
+                "timestamp": timestamp,
+            },
+        )
 
     def log_access_event(
         self,
@@ -402,49 +691,43 @@ class FHIRLogger:
         outcome: str = "success",
     ):
         """Log an access event (possibly with context)"""
-        with Session(self.engine) as session:
-            # Get practitioner and patient objects
-            practitioner = session.get(Practitioner, practitioner_id)
-            patient = session.get(Patient, patient_id)
-
-            if not practitioner or not patient:
-                raise ValueError("Practitioner or Patient not found")
-
-            # Create the  event
-            audit_event = AuditEvent(
-                event_type=event_type,
-                recorded=recorded,
-                target_resource_type=target_resource_type,
-                target_resource_id=target_resource_id,
-                action=action,
-                purpose=purpose,
-                purpose_of_event=purpose_of_event,
-                outcome=outcome,
-                practitioner_id=practitioner_id,
-                patient_id=patient_id,
-            )
+        # Create the  event
+        audit_event_id = self._enqueue(
+            AuditEvent.__table__.name,
+            {
+                "id": self._new_id(),
+                "resource_type": "AuditEvent",
+                "recorded": recorded,
+                "action": action,
+                "target_resource_type": target_resource_type,
+                "target_resource_id": target_resource_id,
+                "event_type": event_type,
+                "purpose": purpose,
+                "outcome": outcome,
+                "practitioner_id": practitioner_id,
+                "patient_id": patient_id,
+                "purpose_of_event": purpose_of_event,
+            },
+        )
 
-            session.add(audit_event)
-            session.commit()
-            session.refresh(audit_event)
-
-            # Log provenance
-            self._log_provenance(
-                action="create",
-                recorded=recorded,
-                resource=audit_event,
-                practitioner=practitioner,
-                before=None,
-                after={
-                    "event_type": event_type,
-                    "purpose": purpose,
-                    "target_resource": (
-                        f"{target_resource_type}/{target_resource_id}"
-                        if target_resource_type
-                        else None
-                    ),
-                    "outcome": outcome,
-                },
-            )
+        # Log provenance
+        self._log_provenance(
+            action="create",
+            recorded=recorded,
+            resource_type="AuditEvent",
+            resource_id=audit_event_id,
+            practitioner_id=practitioner_id,
+            before=None,
+            after={
+                "event_type": event_type,
+                "purpose": purpose,
+                "target_resource": (
+                    f"{target_resource_type}/{target_resource_id}"
+                    if target_resource_type
+                    else None
+                ),
+                "outcome": outcome,
+            },
+        )
 
-            return audit_event.id
+        return audit_event_id
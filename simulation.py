@@ -1,18 +1,42 @@
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from heapq import heappop, heappush
+from itertools import accumulate, count
+from datetime import date, timedelta
 from typing import Union
-from sqlmodel import SQLModel, Session, create_engine, select
+from sqlmodel import SQLModel, Session, create_engine
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
+import argparse
+import logging
+import multiprocessing
 import random
+import numpy as np
 import simpy
 from faker import Faker
 import utilities
 import models
 import os
+import sqlite3
+import uuid
 
 # Use Faker for the generation of user data
 fake = Faker()
 
+# Simulation events are logged (rather than printed) so that the cost of formatting
+# and writing them is only paid when the log level is enabled
+logger = logging.getLogger("simulation")
+
 # Set a random seed for reproducibility
 Faker.seed(42)
 random.seed(42)
+rng = np.random.default_rng(42)
+
+# Dedicated random number generator for the simulation processes (bound methods
+# of a local instance avoid going through the module-level shared instance)
+_rand = random.Random(42)
 
 # === Simulation Configuration ===
 
@@ -33,12 +57,20 @@ EVENT_TYPE_WEIGHTS = {
     "Encounter": 1.0 / 3.0,
     "Observation": 1.0 / 3.0,
 }
+# Cumulative probabilities of all but the last event type, so that the type of an
+# event can be drawn with a single random number
+_EVENT_TYPES = tuple(EVENT_TYPE_WEIGHTS)
+_EVENT_TYPE_CDF = tuple(
+    accumulate(
+        weight / sum(EVENT_TYPE_WEIGHTS.values())
+        for weight in EVENT_TYPE_WEIGHTS.values()
+    )
+)[:-1]
 
 # === Appointment Configuration ===
 
 # Possible durations for appointments and encounters
 APPOINTMENT_VISIT_DURATIONS = [10, 15, 20, 25, 30, 35, 40, 45, 50, 55, 60]
-APPOINTMENT_VISIT_DURATION = lambda: random.choice(APPOINTMENT_VISIT_DURATIONS)
 
 # Probabilities related to appointments
 APPOINTMENT_CANCEL_PROBABILITY = 0.10
@@ -61,6 +93,10 @@ OBSERVATION_CODES = {
     4: ("2345-7", "Blood Glucose"),
 }
 OBSERVATIONS_MAX = 5
+# Observation codes in the order they are recorded during a sequence of observations
+_OBSERVATION_CODE_SEQUENCE = tuple(
+    OBSERVATION_CODES[i] for i in range(OBSERVATIONS_MAX)
+)
 
 # === Access Event Configuration ===
 
@@ -69,6 +105,21 @@ BTG_ACCESS_PROBABILITY = 0.05
 STANDALONE_BTG_ACCESS_PROBABILITY = 0.05
 STANDALONE_NORMAL_ACCESS_PROBABILITY = 0.05
 
+# Cumulative probabilities of a standalone BTG, normal or no access event, so that
+# the type of a standalone event can be drawn with a single random number
+_STANDALONE_ACCESS_CDF = (
+    STANDALONE_BTG_ACCESS_PROBABILITY,
+    STANDALONE_BTG_ACCESS_PROBABILITY + STANDALONE_NORMAL_ACCESS_PROBABILITY,
+)
+_STANDALONE_ACCESS_EVENT_TYPES = (
+    models.AccessEventType.EMERGENCY,
+    models.AccessEventType.CARE,
+    None,
+)
+
+# Number of waiting times and event type draws sampled at once with NumPy
+STANDALONE_ACCESS_BATCH_SIZE = 4096
+
 # === Patient Scheduling Configuration ===
 
 # Cooldown duration between appointment bookings
@@ -85,14 +136,29 @@ lambda_4 = 31 * 3
 lambda_multiplier = 60 * 24
 
 
+# Number of cooldown durations sampled at once with NumPy
+COOLDOWN_BATCH_SIZE = 4096
+# Cooldown durations that have been sampled but not used yet
+_cooldown_times = iter(())
+
+
+def sample_cooldown_times(count: int) -> list:
+    """Sample a batch of cooldown durations in days"""
+    # 75% chance of a SHORT cooldown time, otherwise a LONG cooldown time
+    short = rng.random(count) < 0.75
+    short_cooldowns = rng.integers(lambda_1, lambda_2, size=count, endpoint=True)
+    long_cooldowns = rng.integers(lambda_3, lambda_4, size=count, endpoint=True)
+    return np.where(short, short_cooldowns, long_cooldowns).tolist()
+
+
 # Function to generate cooldown duration
 def sample_cooldown_time():
-    if random.random() < 0.75:
-        # print("... Sampling SHORT cooldown time ...")
-        return random.randint(lambda_1, lambda_2)
-    else:
-        # print("... Sampling LONG cooldown time ...")
-        return random.randint(lambda_3, lambda_4)
+    global _cooldown_times
+    cooldown = next(_cooldown_times, None)
+    if cooldown is None:
+        _cooldown_times = iter(sample_cooldown_times(COOLDOWN_BATCH_SIZE))
+        cooldown = next(_cooldown_times)
+    return cooldown
 
 
 # Cooldown duration between appointment bookings
@@ -107,13 +173,6 @@ if SIMULATION_DURATION_IN_MINUTES < lambda_4:
         + " Patients may arrive after the simulation has concluded."
     )
 
-# Track last activity time for each patient
-last_patient_activity: dict = {}
-
-# Track currently active/ongoing appointments
-# Tuples of (patient_id, practitioner.id)
-active_appointments: set[tuple[str, str]] = set()
-
 # === Patient Population Configuration ===
 
 # Probabilities related to patient population dynamics
@@ -122,190 +181,94 @@ PATIENT_DISCHARGE_PROBABILITY = 0.10
 # 10% chance to add new patients each cycle
 PATIENT_ADMITTANCE_PROBABILITY = 0.10
 
+# The discharge test runs for every patient turn, so it compares 32 random bits
+# against a precomputed threshold rather than drawing a random float
+_DISCHARGE_THRESHOLD = round(PATIENT_DISCHARGE_PROBABILITY * (1 << 32))
+
 # Target and minimum patient population
 PATIENT_TARGET_POPULATION = int(NUMBER_OF_PATIENTS * 1.00)
 PATIENT_MIN_POPULATION = int(PATIENT_TARGET_POPULATION * 0.75)
 
+# === Person Generation Configuration ===
+
+# Names are drawn from pools sampled once with Faker, rather than calling Faker
+# for every new patient or practitioner
+NAME_POOL_SIZE = 1000
+FIRST_NAMES = tuple(fake.first_name() for _ in range(NAME_POOL_SIZE))
+LAST_NAMES = tuple(fake.last_name() for _ in range(NAME_POOL_SIZE))
+GENDERS = ("male", "female")
+
+# Birthdates span the same 0 to 115 year age range as Faker's date_of_birth
+BIRTHDATE_MAX_ORDINAL = date.today().toordinal()
+BIRTHDATE_MIN_ORDINAL = (date.today() - timedelta(days=round(115 * 365.25))).toordinal()
+
+# === Logging Configuration ===
+
+# Buffered events are written to the database at least once per simulated day
+FHIR_LOGGER_FLUSH_INTERVAL_IN_MINUTES = 60 * 24
+# ... or as soon as this many resources and status updates are buffered
+FHIR_LOGGER_BATCH_SIZE = 5000
+
 
 def find_next_available_time(
-    engine,
     requested_time: int,
     practitioner_object: models.Practitioner,
     appointment_duration: int,
 ) -> int:
     """Efficiently find next available slot using gap search"""
 
-    def fetch_busy_slots(session: Session) -> list[tuple[int, int]]:
-        """Fetch all busy slots sorted by start time"""
-        # search_window_end = requested_time + 7 * 24 * 60  # look 7 days ahead
-        search_window_end = requested_time + 14 * 24 * 60  # look 14 days ahead
-
-        appointments = session.exec(
-            select(models.Appointment)
-            .where(models.Appointment.practitioner_id == practitioner_object.id)
-            .where(
-                (
-                    models.Appointment.status.in_(
-                        [
-                            models.AppointmentStatus.BOOKED,
-                            models.AppointmentStatus.NOSHOW,
-                        ]
-                    )
-                )
-                & (models.Appointment.scheduled_start_time < search_window_end)
-                & (
-                    (
-                        models.Appointment.scheduled_start_time
-                        + models.Appointment.duration
-                    )
-                    > requested_time
-                )
-            )
-        ).all()
-
-        encounters = session.exec(
-            select(models.Encounter).where(
-                (models.Encounter.practitioner_id == practitioner_object.id)
-                & (models.Encounter.actual_start_time < search_window_end)
-                & (
-                    (models.Encounter.actual_start_time + models.Encounter.duration)
-                    > requested_time
-                )
-            )
-        ).all()
-
-        observations = session.exec(
-            select(models.Observation).where(
-                (models.Observation.practitioner_id == practitioner_object.id)
-                & (models.Observation.timestamp < search_window_end)
-                & ((models.Observation.timestamp + 1) > requested_time)
-            )
-        ).all()
-
-        # Build list of (start, end) tuples
-        booked_slots = [
-            (x.scheduled_start_time, x.scheduled_start_time + x.duration)
-            for x in appointments
-        ]
-        encounter_slots = [
-            (x.actual_start_time, x.actual_start_time + x.duration) for x in encounters
-        ]
-        observation_slots = [(x.timestamp, x.timestamp + 1) for x in observations]
-
-        all_slots = booked_slots + encounter_slots + observation_slots
-        # Sort booked timeslots by start time
-        return sorted(all_slots, key=lambda x: x[0])
-
-    def is_within_working_hours(t_start: int, t_end: int) -> bool:
-        """Check if time slot is within practitioner's working schedule"""
-        day = (t_start // (24 * 60)) % 7
-        minute_of_day_start = t_start % (24 * 60)
-        minute_of_day_end = t_end % (24 * 60)
-
-        if practitioner_object._work_schedule is None:
-            raise ValueError("No work schedule defined for practitioner!")
-
-        for work_start, work_end in practitioner_object._work_schedule.get(day, []):
-            if work_start <= minute_of_day_start and minute_of_day_end <= work_end:
-                return True
-        return False
+    # Busy slots (booked and no-show appointments, encounters and observations)
+    # in order of start time, looking 14 days ahead
+    # search_window_end = requested_time + 7 * 24 * 60  # look 7 days ahead
+    busy_slots = practitioner_object.busy_slots_between(
+        requested_time, requested_time + 14 * 24 * 60
+    )
 
-    with Session(engine) as session:
-        busy_slots = fetch_busy_slots(session)
-
-        # Start by assuming time is available starting from requested_time
-        current_time = max(requested_time, 0)
-
-        # Scan through gaps between busy slots
-        for slot_start, slot_end in busy_slots:
-            # Check if gap between current_time and next busy slot is big enough
-            if current_time + appointment_duration <= slot_start:
-                # Is this gap during working hours?
-                if is_within_working_hours(
-                    current_time, current_time + appointment_duration
-                ):
-                    # found available slot
-                    return current_time
-            # Move current_time forward if this busy slot ends after it
-            if slot_end > current_time:
-                current_time = slot_end
-
-        # After checking all busy slots, check remaining time window (till 7 days ahead)
-        search_window_end = requested_time + 7 * 24 * 60
-        while current_time + appointment_duration <= search_window_end:
-            if is_within_working_hours(
-                current_time, current_time + appointment_duration
-            ):
+    # Start by assuming time is available starting from requested_time
+    current_time = max(requested_time, 0)
+
+    # Scan through gaps between busy slots
+    for slot_start, slot_end in busy_slots:
+        # Check if gap between current_time and next busy slot is big enough
+        if current_time + appointment_duration <= slot_start:
+            # Is this gap during working hours? Slots crossing midnight are not
+            # accepted, as work windows end by midnight
+            if practitioner_object.is_working(current_time, appointment_duration):
+                # found available slot
                 return current_time
-            # Move to next minute (could be optimized to jump by working hours)
-            current_time += 1
+        # Move current_time forward if this busy slot ends after it
+        if slot_end > current_time:
+            current_time = slot_end
+
+    # After checking all busy slots, check remaining time window (till 7 days ahead)
+    # by jumping straight to the next work window that is long enough
+    search_window_end = requested_time + 7 * 24 * 60
+    slot_start = practitioner_object.next_working_time(
+        current_time, appointment_duration
+    )
+    if (
+        slot_start is not None
+        and slot_start + appointment_duration <= search_window_end
+    ):
+        return slot_start
 
-        raise Exception("No available slot found in the next 7 days.")
+    raise Exception("No available slot found in the next 7 days.")
 
 
 def is_time_available(
-    engine,
     environment,
     practitioner_object: models.Practitioner,
     start_time: int,
     duration: int,
 ) -> bool:
     """Check if a practitioner has any conflicts during the specified time period"""
-    end_time = start_time + duration
-
-    with Session(engine) as session:
-        # Check appointments
-        conflicting_appointments = session.exec(
-            select(models.Appointment)
-            .where(models.Appointment.practitioner_id == practitioner_object.id)
-            .where(models.Appointment.status == models.AppointmentStatus.BOOKED)
-            .where(models.Appointment.scheduled_start_time < end_time)
-            .where(
-                models.Appointment.scheduled_start_time + models.Appointment.duration
-                > start_time
-            )
-        ).first()
-
-        if conflicting_appointments:
-            return False
-
-        # Check encounters
-        conflicting_encounters = session.exec(
-            select(models.Encounter)
-            .where(models.Encounter.practitioner_id == practitioner_object.id)
-            .where(models.Encounter.actual_start_time < end_time)
-            .where(
-                models.Encounter.actual_start_time + models.Encounter.duration
-                > start_time
-            )
-        ).first()
-
-        if conflicting_encounters:
-            return False
-
-        # Check observations
-        conflicting_observations = session.exec(
-            select(models.Observation)
-            .where(models.Observation.practitioner_id == practitioner_object.id)
-            .where(models.Observation.timestamp >= start_time)
-            .where(models.Observation.timestamp < end_time)
-        ).first()
-
-        if conflicting_observations:
-            return False
+    # Booked appointments, encounters and observations are all kept track of in
+    # the practitioner's in-memory busy slots, so no database lookup is needed
+    if practitioner_object.is_busy(start_time, start_time + duration):
+        return False
 
     # Also check if within working hours
-    day = (start_time // (24 * 60)) % 7
-    minute_of_day = start_time % (24 * 60)
-
-    if practitioner_object._work_schedule is None:
-        raise ValueError("Practitioner has no work schedule defined")
-
-    for work_start, work_end in practitioner_object._work_schedule.get(day, []):
-        if work_start <= minute_of_day <= work_end - duration:
-            return True
-
-    return False
+    return practitioner_object.is_working(start_time, duration)
 
 
 # TODO: Make sure that appointments start at somewhat regular points in time!
@@ -316,7 +279,7 @@ def is_time_available(
 #     practitioner_object: models.Practitioner,
 #     patient_object: models.Patient,
 # ):
-#     appointment_duration = APPOINTMENT_VISIT_DURATION()
+#     appointment_duration = _rand.choice(APPOINTMENT_VISIT_DURATIONS)
 #     key = (patient_object.id, practitioner_object.id)
 
 #     requested_time = environment.now
@@ -441,94 +404,125 @@ def is_time_available(
 
 
 def appointment(
-    engine,
     environment,
     fhir_logger: models.FHIRLogger,
     practitioner_object: models.Practitioner,
     patient_object: models.Patient,
 ):
-    appointment_duration = APPOINTMENT_VISIT_DURATION()
-    key = (patient_object.id, practitioner_object.id)
+    appointment_duration = _rand.choice(APPOINTMENT_VISIT_DURATIONS)
+
+    # Bind repeatedly looked up attributes to local names once
+    patient_id = patient_object.id
+    practitioner_id = practitioner_object.id
+    random_value = _rand.random
 
     requested_time = environment.now
     # Step 1: Search for a future time slot
     scheduled_start_time = find_next_available_time(
-        engine, requested_time, practitioner_object, appointment_duration
+        requested_time, practitioner_object, appointment_duration
     )
 
     if scheduled_start_time is None:
-        print(
-            f"[{environment.now:>4}] No available time found for {patient_object.id} with {practitioner_object.id}"
+        logger.debug(
+            "[%4s] No available time found for %s with %s",
+            environment.now,
+            patient_id,
+            practitioner_id,
         )
         return None
 
     # Step 2: Reserve the slot by logging the scheduled appointment
     appointment_id = fhir_logger.log_appointment(
-        patient_id=patient_object.id,
+        patient_id=patient_id,
         created=environment.now,
         status=models.AppointmentStatus.BOOKED,
-        practitioner_id=practitioner_object.id,
+        practitioner_id=practitioner_id,
         duration=appointment_duration,
         scheduled_start_time=scheduled_start_time,
     )
+    scheduled_end_time = scheduled_start_time + appointment_duration
+    practitioner_object.record_busy_slot(
+        scheduled_start_time, scheduled_end_time, appointment_id
+    )
 
-    print(
-        f"[{environment.now:>4}] {patient_object.id} scheduled with {practitioner_object.id} at {scheduled_start_time} for {appointment_duration} min"
+    logger.debug(
+        "[%4s] %s scheduled with %s at %s for %s min",
+        environment.now,
+        patient_id,
+        practitioner_id,
+        scheduled_start_time,
+        appointment_duration,
     )
 
     # Step 3: Simulate potential cancellation before appointment
     total_wait_time = int(scheduled_start_time - environment.now)
-    cancellation_check_time = 0
-    if total_wait_time > 0:
 
-        # Step 3.1: Random cancellation in between now and the scheduled appointment time
-        cancellation_check_time = random.randint(0, total_wait_time)
+    # Step 3.1: Decide up-front whether the appointment will be cancelled, so that
+    # only cancelled appointments pay for an extra intermediate timeout
+    if total_wait_time > 0 and random_value() < APPOINTMENT_CANCEL_PROBABILITY:
+
+        # Step 3.2: Cancel at a random point in between now and the scheduled appointment time
+        cancellation_check_time = _rand.randrange(0, total_wait_time + 1)
         # Use the 'timeout' function to simulate the passage of time
         yield environment.timeout(cancellation_check_time)
 
-        # Step 3.2: Check to see if we should cancel the appointment at this time
-        if random.random() < APPOINTMENT_CANCEL_PROBABILITY:
-            fhir_logger.update_appointment_status(
-                appointment_id=appointment_id,
-                new_status=models.AppointmentStatus.CANCELLED,
-                recorded=environment.now,
-                practitioner_id=practitioner_object.id,
-                reason="Patient cancelled",
-            )
-            print(
-                f"[{environment.now:>4}] {patient_object.id} CANCELLED appointment with {practitioner_object.id}"
-            )
-            return None
+        fhir_logger.queue_status_update(
+            appointment_id=appointment_id,
+            new_status=models.AppointmentStatus.CANCELLED,
+            recorded=environment.now,
+            practitioner_id=practitioner_id,
+            reason="Patient cancelled",
+        )
+        practitioner_object.release_busy_slot(
+            scheduled_start_time, scheduled_end_time, appointment_id
+        )
+        logger.debug(
+            "[%4s] %s CANCELLED appointment with %s",
+            environment.now,
+            patient_id,
+            practitioner_id,
+        )
+        return None
 
-    # 3.3 The appointment was not cancelled, so wait the remaining time until the scheduled appointment
-    remaining_wait_time = total_wait_time - cancellation_check_time
-    yield environment.timeout(remaining_wait_time)
+    # 3.3 The appointment will not be cancelled, so wait until the scheduled appointment
+    # in a single timeout (skipped entirely if the appointment starts right away)
+    if total_wait_time > 0:
+        yield environment.timeout(total_wait_time)
 
     # Step 4: Show up or no-show
-    if random.random() < APPOINTMENT_NOSHOW_PROBABILITY:
+    if random_value() < APPOINTMENT_NOSHOW_PROBABILITY:
         # Mark as no-show
-        fhir_logger.update_appointment_status(
+        fhir_logger.queue_status_update(
             appointment_id=appointment_id,
             new_status=models.AppointmentStatus.NOSHOW,
             recorded=environment.now,
-            practitioner_id=practitioner_object.id,
+            practitioner_id=practitioner_id,
         )
-        print(
-            f"[{environment.now:>4}] {patient_object.id} NO-SHOW for appointment with {practitioner_object.id}"
+        practitioner_object.release_busy_slot(
+            scheduled_start_time, scheduled_end_time, appointment_id, no_show=True
+        )
+        logger.debug(
+            "[%4s] %s NO-SHOW for appointment with %s",
+            environment.now,
+            patient_id,
+            practitioner_id,
         )
         return None
 
     # Step 5: Attend appointment
     with practitioner_object.resource.request() as request:
         yield request
-        active_appointments.add(key)
 
-        print(
-            f"[{environment.now:>4}] {practitioner_object.id} starts APPOINTMENT with {patient_object.id} ({appointment_duration} min)"
+        logger.debug(
+            "[%4s] %s starts APPOINTMENT with %s (%s min)",
+            environment.now,
+            practitioner_id,
+            patient_id,
+            appointment_duration,
         )
 
         # With some probability, the appointment progresses in the form of a sequence of Observations
-        if random.random() < OBSERVATIONS_DURING_APPOINTMENT_PROBABILITY:
+        if random_value() < OBSERVATIONS_DURING_APPOINTMENT_PROBABILITY:
             # Generate observations during appointment
             obs_process = environment.process(
                 observations(
@@ -556,7 +550,7 @@ def appointment(
                 )
             )
             # Add potential BTG event during appointment
-            if random.random() < BTG_ACCESS_PROBABILITY:
+            if random_value() < BTG_ACCESS_PROBABILITY:
                 btg_proc = environment.process(
                     resource_access_process(
                         environment=environment,
@@ -573,13 +567,14 @@ def appointment(
             else:
                 yield main_process
 
-        active_appointments.discard(key)
-
-        fhir_logger.update_appointment_status(
+        fhir_logger.queue_status_update(
             appointment_id=appointment_id,
             new_status=models.AppointmentStatus.FINISHED,
             recorded=environment.now,
-            practitioner_id=practitioner_object.id,
+            practitioner_id=practitioner_id,
+        )
+        practitioner_object.release_busy_slot(
+            scheduled_start_time, scheduled_end_time, appointment_id
         )
 
 
@@ -593,19 +588,27 @@ def encounter(
     appointment_duration: int,
 ):
     """Simulates an encounter inside the timeframe of the appointment."""
-    print(
-        f"[{environment.now:>4}] {practitioner_object.id} begins ENCOUNTER with {patient_object.id}"
+    # Bind repeatedly looked up attributes to local names once
+    patient_id = patient_object.id
+    practitioner_id = practitioner_object.id
+    random_value = _rand.random
+
+    logger.debug(
+        "[%4s] %s begins ENCOUNTER with %s",
+        environment.now,
+        practitioner_id,
+        patient_id,
     )
 
     # Calculate encounter duration
     encounter_duration = max(
         min(APPOINTMENT_VISIT_DURATIONS),
-        random.randint(appointment_duration // 2, appointment_duration),
+        _rand.randrange(appointment_duration // 2, appointment_duration + 1),
     )
 
     # Calculate maximum possible start delay
     max_delay = appointment_duration - encounter_duration
-    start_delay = random.randint(0, max_delay)
+    start_delay = _rand.randrange(0, max_delay + 1)
 
     # Calculate actual start and end times
     encounter_start = appointment_start + start_delay
@@ -616,16 +619,17 @@ def encounter(
 
     # Log the encounter between the patient and practitioner
     encounter_id = fhir_logger.log_encounter(
-        patient_id=patient_object.id,
+        patient_id=patient_id,
         actual_start_time=encounter_start,
         # actual_start_time=appointment_start,
         duration=encounter_duration,
-        practitioner_id=practitioner_object.id,
+        practitioner_id=practitioner_id,
         appointment_id=appointment_id,
     )
+    practitioner_object.record_busy_slot(encounter_start, encounter_end)
 
     # Add potential BTG event during encounter
-    if random.random() < BTG_ACCESS_PROBABILITY:
+    if random_value() < BTG_ACCESS_PROBABILITY:
         btg_proc = environment.process(
             resource_access_process(
                 environment=environment,
@@ -641,7 +645,7 @@ def encounter(
     else:
         yield main_process
 
-    if random.random() < OBSERVATIONS_DURING_ENCOUNTER_PROBABILITY:
+    if random_value() < OBSERVATIONS_DURING_ENCOUNTER_PROBABILITY:
         yield environment.process(
             observations(
                 environment,
@@ -661,15 +665,25 @@ def biased_times(start_time, end_time, count: int, bias_strength: float = 2.0):
     if total_minutes == 0:
         raise ValueError("total_minutes = 0, so no biased times can be generated!")
 
-    points: set[int] = set()
-    while len(points) < count:
-        # Generate biased random number between 0 and 1
-        r = random.random() ** bias_strength
-        minute_offset = int(r * total_minutes)
-        points.add(minute_offset)
+    if count > total_minutes:
+        raise ValueError(
+            f"{count} distinct times cannot be generated within {total_minutes} minutes!"
+        )
+
+    # Draw biased random numbers between 0 and 1 in batches and keep the first
+    # 'count' distinct minute offsets, drawing another batch if there are too
+    # many duplicates
+    offsets = np.empty(0, dtype=np.int64)
+    while True:
+        r = rng.random(count + 2) ** bias_strength
+        offsets = np.concatenate((offsets, (r * total_minutes).astype(np.int64)))
+        unique_offsets, first_indices = np.unique(offsets, return_index=True)
+        if unique_offsets.size >= count:
+            break
+    points = np.sort(offsets[np.sort(first_indices)[:count]])
 
-    # Convert offsets back to datetime objects
-    return [start_time + offset for offset in sorted(points)]
+    # Convert offsets back to points in time
+    return (start_time + points).tolist()
 
 
 def observations(
@@ -692,12 +706,12 @@ def observations(
         # a timeframe equal to the minimum duration of an appointment
         appointment_duration = min(APPOINTMENT_VISIT_DURATIONS)
         # Calculate encounter duration
-        encounter_duration = random.randint(
-            appointment_duration // 2, appointment_duration
+        encounter_duration = _rand.randrange(
+            appointment_duration // 2, appointment_duration + 1
         )
         # Calculate maximum possible start delay
         max_delay = appointment_duration - encounter_duration
-        start_delay = random.randint(0, max_delay)
+        start_delay = _rand.randrange(0, max_delay + 1)
 
         # Calculate actual start and end times
         # encounter_start = appointment_start + start_delay
@@ -707,7 +721,7 @@ def observations(
         # count = 1
         # obs_times = [encounter_start]
     # else:
-    count = random.randint(1, OBSERVATIONS_MAX)
+    count = _rand.randrange(1, OBSERVATIONS_MAX + 1)
     obs_times = biased_times(
         encounter_start,
         encounter_start + remaining_appointment_duration,
@@ -715,26 +729,43 @@ def observations(
         bias_strength=1.75,
     )
 
-    for i in range(count):
-        code, display = OBSERVATION_CODES[i % OBSERVATIONS_MAX]
-        value = (
-            f"{random.uniform(96, 99):.1f} °F"
-            if i == 0
-            else str(random.randint(60, 100))
+    # Draw all observation values up front: the first observation is a body
+    # temperature, the remaining ones are integer readings
+    values = [f"{_rand.uniform(96, 99):.1f} °F"]
+    values.extend(
+        str(value) for value in rng.integers(60, 101, size=count - 1).tolist()
+    )
+
+    # Bind what is looked up for every observation to local names once
+    patient_id = patient_object.id
+    practitioner_id = practitioner_object.id
+    log_observation = fhir_logger.log_observation
+    record_busy_slot = practitioner_object.record_busy_slot
+    random_value = _rand.random
+
+    for i, (obs_time, (code, display), value) in enumerate(
+        zip(obs_times, _OBSERVATION_CODE_SEQUENCE, values)
+    ):
+        logger.debug(
+            "[%4s] Observation %s for patient %s",
+            obs_time,
+            i + 1,
+            patient_id,
         )
-        print(f"[{obs_times[i]:>4}] Observation {i+1} for patient {patient_object.id}")
 
-        obs_id = fhir_logger.log_observation(
-            patient_id=patient_object.id,
-            practitioner_id=practitioner_object.id,
-            timestamp=obs_times[i],
+        obs_id = log_observation(
+            patient_id=patient_id,
+            practitioner_id=practitioner_id,
+            timestamp=obs_time,
             code=code,
             value=value,
             encounter_id=encounter_id,
         )
+        record_busy_slot(obs_time, obs_time + 1)
 
-        # Add potential BTG event during observation
-        if random.random() < BTG_ACCESS_PROBABILITY:
+        # Add potential BTG event during observation, which is the only point at
+        # which the process has to wait for the simulation
+        if random_value() < BTG_ACCESS_PROBABILITY:
             yield environment.process(
                 resource_access_process(
                     environment=environment,
@@ -747,8 +778,6 @@ def observations(
                 )
             )
 
-        yield environment.timeout(0)
-
 
 def resource_access_process(
     environment,
@@ -798,10 +827,13 @@ def resource_access_process(
         outcome="success",
     )
 
-    print(
-        f"[{environment.now:>4}] AUDIT EVENT {event_type}"
-        f" by {practitioner_object.id} for {patient_object.id}"
-        f"{f' during {context_resource_type}' if context_resource_type else ''}"
+    logger.debug(
+        "[%4s] AUDIT EVENT %s by %s for %s%s",
+        environment.now,
+        event_type.value,
+        practitioner_object.id,
+        patient_object.id,
+        f" during {context_resource_type}" if context_resource_type else "",
     )
 
 
@@ -812,127 +844,222 @@ def standalone_access_event_generator(
     Independent process that generates standalone access events
     (either ordinary or break-the-class emergency events)
     """
-    while True:
-        # Wait random interval (1-24 hours in simulation minutes)
-        # before deciding of a random access event should be triggered
-        yield environment.timeout(random.randint(60, 60 * 24))
+    # The practitioner and patient populations used for standalone events are
+    # fixed, so their ids only need to be collected once
+    practitioner_ids = tuple(practitioner_objects)
+    patient_ids = tuple(patient_objects)
 
-        if random.random() < STANDALONE_BTG_ACCESS_PROBABILITY:
-            # Randomly select practitioner and patient
-            practitioner_id = random.choice(list(practitioner_objects.keys()))
-            patient_id = random.choice(list(patient_objects.keys()))
-            practitioner = practitioner_objects[practitioner_id]
-            patient = patient_objects[patient_id]
+    random_choice = _rand.choice
+    timeout = environment.timeout
+
+    while True:
+        # Draw the next batch of waiting times and event type decisions at once
+        waiting_times = rng.integers(
+            60, 60 * 24, size=STANDALONE_ACCESS_BATCH_SIZE, endpoint=True
+        ).tolist()
+        random_values = rng.random(STANDALONE_ACCESS_BATCH_SIZE).tolist()
+
+        for waiting_time, random_value in zip(waiting_times, random_values):
+            # Wait random interval (1-24 hours in simulation minutes)
+            # before deciding of a random access event should be triggered
+            yield timeout(waiting_time)
+
+            # Decide if a BTG, a normal or no access event should be triggered
+            event_type = _STANDALONE_ACCESS_EVENT_TYPES[
+                bisect_right(_STANDALONE_ACCESS_CDF, random_value)
+            ]
+            if event_type is None:
+                continue
 
-            # Trigger BTG access event
-            environment.process(
-                resource_access_process(
-                    environment=environment,
-                    fhir_logger=fhir_logger,
-                    practitioner_object=practitioner,
-                    patient_object=patient,
-                    event_type=models.AccessEventType.EMERGENCY,
-                )
-            )
-        elif random.random() < STANDALONE_NORMAL_ACCESS_PROBABILITY:
             # Randomly select practitioner and patient
-            practitioner_id = random.choice(list(practitioner_objects.keys()))
-            patient_id = random.choice(list(patient_objects.keys()))
-            practitioner = practitioner_objects[practitioner_id]
-            patient = patient_objects[patient_id]
+            practitioner = practitioner_objects[random_choice(practitioner_ids)]
+            patient = patient_objects[random_choice(patient_ids)]
 
-            # Trigger a normal access event
-            environment.process(
-                resource_access_process(
-                    environment=environment,
-                    fhir_logger=fhir_logger,
-                    practitioner_object=practitioner,
-                    patient_object=patient,
-                    event_type=models.AccessEventType.CARE,
-                )
+            # Trigger the access event. It is logged without any delay, so it is
+            # run in place rather than as a separate process
+            yield from resource_access_process(
+                environment=environment,
+                fhir_logger=fhir_logger,
+                practitioner_object=practitioner,
+                patient_object=patient,
+                event_type=event_type,
             )
 
 
 def choose_event_type() -> str:
-    return random.choices(
-        population=list(EVENT_TYPE_WEIGHTS.keys()),
-        weights=list(EVENT_TYPE_WEIGHTS.values()),
-        k=1,
-    )[0]
+    return _EVENT_TYPES[bisect_right(_EVENT_TYPE_CDF, _rand.random())]
 
 
 # === Patient Process ===
-def patient_process(
-    engine,
+# A patient turn starts with one of the following events, drawn with
+# choose_event_type, each of which is simulated by its own process:
+# - Appointment
+# - Encounter
+# - Observation
+def appointment_patient_process(
     environment,
     fhir_logger: models.FHIRLogger,
     practitioner_object: models.Practitioner,
     patient_object: models.Patient,
 ):
-    """Simulates a patient triggering events according to probability rules."""
-    # An event sequence can start with one of the following events:
-    # - Appointment
-    # - Encounter
-    # - Observation
-    event_type = choose_event_type()
-
-    if event_type == "Appointment":
+    """Simulates a patient booking and attending an appointment"""
+    yield environment.process(
+        appointment(
+            environment=environment,
+            fhir_logger=fhir_logger,
+            practitioner_object=practitioner_object,
+            patient_object=patient_object,
+        )
+    )
+
+
+def encounter_patient_process(
+    environment,
+    fhir_logger: models.FHIRLogger,
+    practitioner_object: models.Practitioner,
+    patient_object: models.Patient,
+):
+    """Simulates a patient having an encounter right away, if the practitioner is free"""
+    encounter_duration = _rand.choice(APPOINTMENT_VISIT_DURATIONS)
+    current_time = environment.now
+
+    # Check if time is available right now
+    if is_time_available(
+        environment,
+        practitioner_object,
+        current_time,
+        duration=encounter_duration,
+    ):
         yield environment.process(
-            appointment(
-                engine,
+            encounter(
                 environment=environment,
                 fhir_logger=fhir_logger,
                 practitioner_object=practitioner_object,
                 patient_object=patient_object,
+                appointment_start=current_time,
+                appointment_duration=encounter_duration,
+                appointment_id=None,
             )
         )
-    elif event_type == "Encounter":
-        encounter_duration = APPOINTMENT_VISIT_DURATION()
-        current_time = environment.now
-
-        # Check if time is available right now
-        if is_time_available(
-            engine,
-            environment,
-            practitioner_object,
-            current_time,
-            duration=encounter_duration,
-        ):
-            yield environment.process(
-                encounter(
-                    environment=environment,
-                    fhir_logger=fhir_logger,
-                    practitioner_object=practitioner_object,
-                    patient_object=patient_object,
-                    appointment_start=current_time,
-                    appointment_duration=encounter_duration,
-                    appointment_id=None,
-                )
-            )
-        else:
-            print(f"[{current_time:>4}] Could not start encounter - practitioner busy")
-    elif event_type == "Observation":
-        current_time = environment.now
+    else:
+        logger.debug(
+            "[%4s] Could not start encounter - practitioner busy", current_time
+        )
 
-        # Observations are quick (1 minute), just check exact time
-        if is_time_available(
-            engine, environment, practitioner_object, current_time, duration=1
-        ):
-            yield environment.process(
-                observations(
-                    environment=environment,
-                    fhir_logger=fhir_logger,
-                    practitioner_object=practitioner_object,
-                    patient_object=patient_object,
-                    encounter_start=current_time,
-                    remaining_appointment_duration=0,
-                    encounter_id=None,
-                )
+
+def observation_patient_process(
+    environment,
+    fhir_logger: models.FHIRLogger,
+    practitioner_object: models.Practitioner,
+    patient_object: models.Patient,
+):
+    """Simulates observations of a patient right away, if the practitioner is free"""
+    current_time = environment.now
+
+    # Observations are quick (1 minute), just check exact time
+    if is_time_available(environment, practitioner_object, current_time, duration=1):
+        yield environment.process(
+            observations(
+                environment=environment,
+                fhir_logger=fhir_logger,
+                practitioner_object=practitioner_object,
+                patient_object=patient_object,
+                encounter_start=current_time,
+                remaining_appointment_duration=0,
+                encounter_id=None,
             )
+        )
+    else:
+        logger.debug(
+            "[%4s] Could not record observation - practitioner busy", current_time
+        )
+
+
+# Patient processes by the type of event they start with
+_PATIENT_PROCESSES = {
+    "Appointment": appointment_patient_process,
+    "Encounter": encounter_patient_process,
+    "Observation": observation_patient_process,
+}
+
+
+class PatientQueue:
+    """Queue of patients in order of when they are eligible for a new turn, which
+    is consumed by a single practitioner
+
+    Unlike a simpy.Store, putting and taking patients does not create any events.
+    An event is only created when the practitioner has to wait for a patient.
+    """
+
+    def __init__(self, environment):
+        self._environment = environment
+        # Heap of (eligible at, insertion order, patient) entries, patients that
+        # are eligible at the same time are taken first-in, first-out
+        self._patients = []
+        self._order = count()
+        self._ready = None
+
+    def __len__(self):
+        return len(self._patients)
+
+    def put(self, patient_object, eligible_at: int = 0):
+        """Add a patient that is eligible from the given time on and wake up a waiting practitioner"""
+        heappush(self._patients, (eligible_at, next(self._order), patient_object))
+        if self._ready is not None:
+            ready, self._ready = self._ready, None
+            ready.succeed()
+
+    def extend(self, patient_objects, eligible_at: int = 0):
+        """Add several patients that are eligible from the given time on at once"""
+        patients = self._patients
+        order = self._order
+        entries = [(eligible_at, next(order), patient) for patient in patient_objects]
+        if not patients:
+            # The entries are in increasing order, so they already form a heap
+            patients.extend(entries)
         else:
-            print(
-                f"[{current_time:>4}] Could not record observation - practitioner busy"
-            )
+            for entry in entries:
+                heappush(patients, entry)
+        if entries and self._ready is not None:
+            ready, self._ready = self._ready, None
+            ready.succeed()
+
+    def next_eligible_at(self) -> int:
+        """Time from which the patient at the front of the queue is eligible"""
+        return self._patients[0][0]
+
+    def pop(self):
+        """Take the patient at the front of the queue"""
+        return heappop(self._patients)[2]
+
+    def wait(self):
+        """Event that is triggered once a patient is put into the empty queue"""
+        self._ready = self._environment.event()
+        return self._ready
+
+
+class PatientCount:
+    """Number of patients in the simulated population
+
+    Admissions never exceed the target population and only admitted patients are
+    discharged, so unlike a simpy.Container, changing the count never has to wait.
+    """
+
+    __slots__ = ("level", "capacity")
+
+    def __init__(self, level: int, capacity: int):
+        self.level = level
+        self.capacity = capacity
+
+    def put(self, amount: int):
+        if self.level + amount > self.capacity:
+            raise ValueError("Patient population exceeds its capacity")
+        self.level += amount
+
+    def get(self, amount: int):
+        if amount > self.level:
+            raise ValueError("Patient population cannot become negative")
+        self.level -= amount
 
 
 def fill_patient_queues(
@@ -940,124 +1067,139 @@ def fill_patient_queues(
     patient_queues,
     patient_objects: list,
 ):
-    number_of_practitioners = len(patient_queues)
-    count = 0
-    # Stop after all patients have been assigned
-    while count < len(patient_objects):
-        patient_object = patient_objects[count]
-        # Round-robin index
-        index = count % number_of_practitioners
-        key = list(patient_queues.keys())[index]
-        queue = patient_queues[key]
-        yield queue.put(patient_object)
-        print(
-            f"[{environment.now}] Patient {patient_object.id} assigned to queue {key}"
-        )
-        count += 1
+    keys = tuple(patient_queues)
+    queues = tuple(patient_queues.values())
+    number_of_practitioners = len(queues)
+    # Patients are assigned round-robin, so each queue gets every n-th patient,
+    # which are added in one go. The queues are unbounded, so this takes effect
+    # right away and there is no need to wait for it
+    for index, queue in enumerate(queues):
+        assigned_patients = patient_objects[index::number_of_practitioners]
+        queue.extend(assigned_patients)
+        if logger.isEnabledFor(logging.DEBUG):
+            for patient_object in assigned_patients:
+                logger.debug(
+                    "[%s] Patient %s assigned to queue %s",
+                    environment.now,
+                    patient_object.id,
+                    keys[index],
+                )
 
 
 # === Practitioner process ===
 def practitioner_process(
     environment,
     fhir_logger,
-    practitioner_id,
     practitioner_object,
     patient_queue,
     active_patient_count,
-    last_patient_activity,
     patient_objects,
     engine,
+    session,
 ):
+    # Bind the per-patient operations once, as this loop runs for every patient turn
+    take_patient = patient_queue.pop
+    put_patient = patient_queue.put
+    process = environment.process
+    timeout = environment.timeout
+    random_value = _rand.random
+    getrandbits = _rand.getrandbits
+    next_eligible_at = patient_queue.next_eligible_at
+    cooldown_time = PATIENT_SCHEDULING_COOLDOWN_IN_MINUTES
+    # Per-patient debug messages are skipped entirely, including looking up their
+    # arguments, unless debug logging was enabled before the simulation started
+    debug = logger.isEnabledFor(logging.DEBUG)
+
     while True:
         # Population maintenance
         if active_patient_count.level < PATIENT_MIN_POPULATION or (
-            random.random() < PATIENT_ADMITTANCE_PROBABILITY
+            random_value() < PATIENT_ADMITTANCE_PROBABILITY
             and active_patient_count.level < PATIENT_TARGET_POPULATION
         ):
             new_patients_needed = PATIENT_TARGET_POPULATION - active_patient_count.level
-            _new_patients = [create_patient(engine) for _ in range(new_patients_needed)]
-            new_patients = {patient.id: patient for patient in _new_patients}
-
-            environment.process(
-                fill_patient_queues(
-                    environment,
-                    {practitioner_id: patient_queue},
-                    list(new_patients.values()),
-                )
-            )
-            yield active_patient_count.put(new_patients_needed)
-            print(
-                f"[{environment.now:>4}] Added {new_patients_needed} new patients (Total: {active_patient_count.level})"
+            _new_patients = [
+                create_patient(engine, persist=False)
+                for _ in range(new_patients_needed)
+            ]
+            save_all(session, _new_patients)
+            patient_queue.extend(_new_patients)
+            active_patient_count.put(new_patients_needed)
+            logger.info(
+                "[%4s] Added %s new patients (Total: %s)",
+                environment.now,
+                new_patients_needed,
+                active_patient_count.level,
             )
 
-        patient_object = yield patient_queue.get()
-
-        current_time = environment.now
-
-        # Cooldown check
-        if patient_object.id in last_patient_activity:
-            (recorded_time, cooldown) = last_patient_activity[patient_object.id]
-            time_since_last = current_time - recorded_time
-
-            if time_since_last < cooldown:
-                remaining_cooldown = cooldown - time_since_last
-                yield environment.timeout(remaining_cooldown)
-                # Put back in correct queue
-                yield patient_queue.put(patient_object)
-                continue
-
-        # Process patient
-        main_process = environment.process(
-            patient_process(
-                engine, environment, fhir_logger, practitioner_object, patient_object
+        if not patient_queue:
+            yield patient_queue.wait()
+
+        # Wait for the cooldown of the next eligible patient to pass, if needed.
+        # This practitioner is the only one putting patients into its queue, so no
+        # patient can become eligible any earlier in the meantime
+        remaining_cooldown = next_eligible_at() - environment.now
+        if remaining_cooldown > 0:
+            yield timeout(remaining_cooldown)
+        patient_object = take_patient()
+
+        # Process patient, starting with a randomly chosen type of event
+        main_process = process(
+            _PATIENT_PROCESSES[choose_event_type()](
+                environment, fhir_logger, practitioner_object, patient_object
             )
         )
         yield main_process
 
         # Discharge logic
-        if random.random() < PATIENT_DISCHARGE_PROBABILITY:
-            yield active_patient_count.get(1)
-            # Patient discharged - remove from tracking
-            if patient_object.id in last_patient_activity:
-                del last_patient_activity[patient_object.id]
-            print(
-                f"[{environment.now:>4}] Patient {patient_object.id} discharged (Remaining: {active_patient_count.level})"
-            )
+        if getrandbits(32) < _DISCHARGE_THRESHOLD:
+            # Patient discharged - simply not put back into the queue
+            active_patient_count.get(1)
+            if debug:
+                logger.debug(
+                    "[%4s] Patient %s discharged (Remaining: %s)",
+                    environment.now,
+                    patient_object.id,
+                    active_patient_count.level,
+                )
         else:
 
-            # Patient continues - requeue immediately (cooldown enforced on next pull)
-            patient_queue.put(patient_object)
-            print(
-                f"[{environment.now:>4}] Patient {patient_object.id} re-queued (eligible after cooldown)"
-            )
+            # Patient continues - requeue, eligible again after a cooldown
+            put_patient(patient_object, environment.now + cooldown_time())
+            if debug:
+                logger.debug(
+                    "[%4s] Patient %s re-queued (eligible after cooldown)",
+                    environment.now,
+                    patient_object.id,
+                )
 
-            # Update activity
-            last_patient_activity[patient_object.id] = (
-                environment.now,
-                PATIENT_SCHEDULING_COOLDOWN_IN_MINUTES(),
-            )
+
+def periodic_flush(environment, fhir_logger: models.FHIRLogger, interval: int):
+    """Regularly write buffered events to the database"""
+    while True:
+        yield environment.timeout(interval)
+        fhir_logger.flush()
 
 
 # === Scheduler ===
 def scheduler(
     engine,
+    session,
     environment,
     fhir_logger,
     patient_queues,
     practitioner_objects,
     patient_objects,
 ):
-    active_patient_count = simpy.Container(
-        environment, init=len(patient_objects), capacity=PATIENT_TARGET_POPULATION
+    active_patient_count = PatientCount(
+        len(patient_objects), capacity=PATIENT_TARGET_POPULATION
     )
-    last_patient_activity = {}
 
-    print(f"[{environment.now:>4}] Starting with {active_patient_count.level} patients")
+    logger.info(
+        "[%4s] Starting with %s patients", environment.now, active_patient_count.level
+    )
 
     # Initial queue filling
-    environment.process(
-        fill_patient_queues(environment, patient_queues, list(patient_objects.values()))
-    )
+    fill_patient_queues(environment, patient_queues, list(patient_objects.values()))
 
     # Create a process for each practitioner
     practitioner_processes = [
@@ -1065,13 +1207,12 @@ def scheduler(
             practitioner_process(
                 environment,
                 fhir_logger,
-                practitioner_id,
                 practitioner_object,
                 patient_queues[practitioner_id],
                 active_patient_count,
-                last_patient_activity,
                 patient_objects,
                 engine,
+                session,
             )
         )
         for practitioner_id, practitioner_object in practitioner_objects.items()
@@ -1081,78 +1222,125 @@ def scheduler(
     yield simpy.events.AllOf(environment, practitioner_processes)
 
 
-def create_patient(engine):
+def random_uuid() -> str:
+    """Draw a version 4 UUID from the seeded random number generator"""
+    return str(uuid.UUID(int=_rand.getrandbits(128), version=4))
+
+
+def random_birthdate() -> date:
+    """Draw a birthdate uniformly from the configured age range"""
+    return date.fromordinal(
+        _rand.randrange(BIRTHDATE_MIN_ORDINAL, BIRTHDATE_MAX_ORDINAL + 1)
+    )
+
+
+def save_all(session: Session, objects: list):
+    """Save patients or practitioners to the database in a single transaction"""
+    # IDs are generated client-side, so the objects do not need to be refreshed
+    session.add_all(objects)
+    session.commit()
+
+
+def create_patient(engine, persist=True):
     patient = models.Patient(
-        id=fake.uuid4(),
-        first_name=fake.first_name(),
-        last_name=fake.last_name(),
-        gender=fake.random_element(elements=["male", "female"]),
-        birthdate=fake.date_of_birth(),
+        id=random_uuid(),
+        first_name=_rand.choice(FIRST_NAMES),
+        last_name=_rand.choice(LAST_NAMES),
+        gender=_rand.choice(GENDERS),
+        birthdate=random_birthdate(),
     )
-    # Save the patient to the database
-    with Session(engine) as session:
-        session.add(patient)
-        session.commit()
-        session.refresh(patient)
+    # Save the patient to the database, unless it is bulk-inserted by the caller
+    if persist:
+        with Session(engine) as session:
+            session.add(patient)
+            session.commit()
+            session.refresh(patient)
     return patient
 
 
-def create_practitioner(engine, environment, role="doctor"):
+def create_practitioner(engine, environment, role="doctor", persist=True):
     if role == "doctor":
         practitioner = models.Practitioner(
             env=environment,
             # Assign a work schedule to the practitioner
             work_schedule=utilities.sample_practitioner_work_schedule(),
             # Fill in the remaining SQLModel fields
-            id=fake.uuid4(),
-            first_name=fake.first_name(),
-            last_name=fake.last_name(),
-            gender=fake.random_element(elements=["male", "female"]),
-            birthdate=fake.date_of_birth(),
+            id=random_uuid(),
+            first_name=_rand.choice(FIRST_NAMES),
+            last_name=_rand.choice(LAST_NAMES),
+            gender=_rand.choice(GENDERS),
+            birthdate=random_birthdate(),
             role=role,
         )
-        # Save the pracitioner to the database
-        with Session(engine) as session:
-            session.add(practitioner)
-            session.commit()
-            session.refresh(practitioner)
+        # Save the pracitioner to the database, unless it is bulk-inserted by the caller
+        if persist:
+            with Session(engine) as session:
+                session.add(practitioner)
+                session.commit()
+                session.refresh(practitioner)
         return practitioner
     else:
         raise ValueError("Other roles than 'doctor' is currently not supported.")
 
 
 # === Main ===
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Trade per-commit fsyncs for write-ahead logging on every new connection"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    # Keep up to 64 MiB of pages cached, temporary tables and indices in memory
+    # and read the database file through a memory map of up to 256 MiB
+    cursor.execute("PRAGMA cache_size=-65536")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.close()
+
+
 def run_simulation(engine, pracitioners: int, patients: int):
 
     # === Simulation Setup ===
     environment = simpy.Environment()
 
-    # Create patients
-    _patient_objects = [create_patient(engine) for _ in range(patients)]
+    # Create patients and practitioners in memory
+    _patient_objects = [create_patient(engine, persist=False) for _ in range(patients)]
     patient_objects = {patient.id: patient for patient in _patient_objects}
 
     _practitioner_objects = [
-        create_practitioner(engine, environment) for _ in range(pracitioners)
+        create_practitioner(engine, environment, persist=False)
+        for _ in range(pracitioners)
     ]
+
+    # One long-lived session is shared by everything that writes or looks up
+    # objects through the ORM, rather than opening a session for each write
+    session = Session(engine, expire_on_commit=False)
+
+    # Save the initial population to the database in bulk, in a single transaction
+    save_all(session, _patient_objects + _practitioner_objects)
     practitioner_objects = {
         practitioner.id: practitioner for practitioner in _practitioner_objects
     }
     patient_queues = {
-        practitioner_object.id: simpy.Store(environment)
+        practitioner_object.id: PatientQueue(environment)
         for practitioner_object in _practitioner_objects
     }
 
-    provenance_tracker = models.ProvenanceTracker(engine=engine)
+    provenance_tracker = models.ProvenanceTracker(engine=engine, session=session)
 
     # Mechanism for logging events
     fhir_logger = models.FHIRLogger(
-        engine=engine, provenance_tracker=provenance_tracker
+        engine=engine,
+        provenance_tracker=provenance_tracker,
+        new_id=random_uuid,
+        batch_size=FHIR_LOGGER_BATCH_SIZE,
+        session=session,
     )
 
     # Launch scheduler
     environment.process(
         scheduler(
             engine=engine,
+            session=session,
             environment=environment,
             fhir_logger=fhir_logger,
             patient_queues=patient_queues,
@@ -1167,30 +1355,158 @@ def run_simulation(engine, pracitioners: int, patients: int):
         )
     )
 
-    # Run simulation
-    environment.run(until=SIMULATION_DURATION_IN_MINUTES)
+    environment.process(
+        periodic_flush(environment, fhir_logger, FHIR_LOGGER_FLUSH_INTERVAL_IN_MINUTES)
+    )
 
+    try:
+        # Run simulation
+        environment.run(until=SIMULATION_DURATION_IN_MINUTES)
+
+        # Write any events that are still buffered
+        fhir_logger.flush()
+    finally:
+        # Release the session's connection, so the indexes can be recreated
+        session.close()
+
+
+def seed_random_number_generators(seed: int):
+    """Reseed all random number generators used by the simulation"""
+    global rng, _cooldown_times
+    Faker.seed(seed)
+    random.seed(seed)
+    _rand.seed(seed)
+    rng = np.random.default_rng(seed)
+    # Discard cooldown durations sampled with the previous seed
+    _cooldown_times = iter(())
+
+
+@contextmanager
+def deferred_indexes(engine):
+    """Drop the secondary indexes while the tables are being filled and recreate them afterwards"""
+    # The simulation itself does not query the tables by any of these indexes, so
+    # they are built once at the end rather than updated with every insert. Unique
+    # indexes enforce constraints while the tables are filled, so they are kept
+    indexes = [
+        index
+        for table in SQLModel.metadata.sorted_tables
+        for index in table.indexes
+        if not index.unique
+    ]
+    for index in indexes:
+        index.drop(engine)
+    try:
+        yield
+    finally:
+        for index in indexes:
+            index.create(engine)
+
+
+def run_replica(seed: int, db_filename: str, in_memory: bool = False) -> str:
+    """Run a single, independent simulation that writes to its own database file"""
+    seed_random_number_generators(seed)
+
+    # Also remove write-ahead log files left behind by an interrupted run
+    for filename in (db_filename, f"{db_filename}-wal", f"{db_filename}-shm"):
+        if os.path.exists(filename):
+            os.remove(filename)
+    # Database setup
+    if in_memory:
+        # All sessions have to share the one connection that holds the database
+        engine = create_engine("sqlite://", poolclass=StaticPool)
+    else:
+        engine = create_engine(f"sqlite:///{db_filename}")
+        event.listen(engine, "connect", set_sqlite_pragmas)
 
-def main():
-    db_filename = "hospital_simulation.db"
+    try:
+        # Create tables
+        SQLModel.metadata.create_all(engine)
 
-    if os.path.exists(db_filename):
-        os.remove(db_filename)
-    # Database setup
-    engine = create_engine(f"sqlite:///{db_filename}")
+        print(
+            f"STARTING SIMULATION OF DURATION: {int(SIMULATION_DURATION_IN_MINUTES):>4}"
+        )
 
-    # Create tables
-    SQLModel.metadata.create_all(engine)
+        # Simulation start: env.now = 0 → Monday at 00:00 (midnight)
+        with deferred_indexes(engine):
+            run_simulation(
+                engine=engine,
+                pracitioners=NUMBER_OF_PRACTITIONERS,
+                patients=NUMBER_OF_PATIENTS,
+            )
+        if in_memory:
+            # Write the whole database to disk at once
+            connection = engine.raw_connection()
+            with sqlite3.connect(db_filename) as destination:
+                connection.driver_connection.backup(destination)
+            destination.close()
+            connection.close()
+    finally:
+        # Closing all connections checkpoints the write-ahead log into the database
+        # file, also when the simulation fails
+        engine.dispose()
+    print(f"[{int(SIMULATION_DURATION_IN_MINUTES):>4}] REACHED END OF SIMULATION.")
+    return db_filename
 
-    print(f"STARTING SIMULATION OF DURATION: {int(SIMULATION_DURATION_IN_MINUTES):>4}")
 
-    # Simulation start: env.now = 0 → Monday at 00:00 (midnight)
-    run_simulation(
-        engine=engine,
-        pracitioners=NUMBER_OF_PRACTITIONERS,
-        patients=NUMBER_OF_PATIENTS,
+def configure_logging(verbose: bool = False):
+    """Set up logging of the simulation from the LOG_LEVEL environment variable"""
+    # Simulation events are only logged when asked for, e.g., LOG_LEVEL=DEBUG,
+    # while --verbose reports changes to the patient population (INFO)
+    default_level = "INFO" if verbose else "WARNING"
+    logging.basicConfig(
+        level=os.environ.get("LOG_LEVEL", default_level).upper(), format="%(message)s"
     )
-    print(f"[{int(SIMULATION_DURATION_IN_MINUTES):>4}] REACHED END OF SIMULATION.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic hospital data")
+    parser.add_argument(
+        "--replicas",
+        type=int,
+        default=1,
+        help="number of independent simulations to run in parallel",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=42,
+        help="random seed of the (first) simulation, replicas use consecutive seeds",
+    )
+    parser.add_argument(
+        "--in-memory",
+        action="store_true",
+        help="keep the database in memory and write it to disk after the simulation",
+    )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="log changes to the patient population (unless LOG_LEVEL is set)",
+    )
+    args = parser.parse_args()
+    if args.replicas < 1:
+        parser.error("--replicas must be at least 1")
+
+    configure_logging(args.verbose)
+
+    if args.replicas == 1:
+        run_replica(args.seed, "hospital_simulation.db", in_memory=args.in_memory)
+        return
+
+    # A simpy simulation runs on a single core, so independent replicas are run
+    # in separate processes, each with its own seed and database file. Worker
+    # processes are spawned rather than forked, so that they do not inherit any
+    # open SQLite handles, and therefore set up logging themselves
+    seeds = range(args.seed, args.seed + args.replicas)
+    db_filenames = [f"hospital_simulation_{seed}.db" for seed in seeds]
+    with ProcessPoolExecutor(
+        max_workers=min(args.replicas, os.cpu_count() or 1),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=configure_logging,
+        initargs=(args.verbose,),
+    ) as executor:
+        replica = partial(run_replica, in_memory=args.in_memory)
+        for db_filename in executor.map(replica, seeds, db_filenames):
+            print(f"Replica written to {db_filename}")
 
 
 # Run it
@@ -1,65 +1,81 @@
+from types import MappingProxyType
 import random
 
+# Weekly work schedules that do not vary between practitioners. They are shared
+# between practitioners, so they are kept read-only (days map to tuples of
+# (start, end) time blocks in minutes of the day)
+FULL_TIME = MappingProxyType(
+    {
+        0: ((9 * 60, 17 * 60),),
+        1: ((9 * 60, 17 * 60),),
+        2: ((9 * 60, 17 * 60),),
+        3: ((9 * 60, 17 * 60),),
+        4: ((9 * 60, 17 * 60),),
+    }
+)
 
-def sample_practitioner_work_schedule(schedule_type=None):
-    """Return a realistic weekly work schedule as a dict of daily time blocks."""
-
-    full_time = {
-        0: [(9 * 60, 17 * 60)],
-        1: [(9 * 60, 17 * 60)],
-        2: [(9 * 60, 17 * 60)],
-        3: [(9 * 60, 17 * 60)],
-        4: [(9 * 60, 17 * 60)],
+EVENING_SHIFT = MappingProxyType(
+    {
+        0: ((14 * 60, 22 * 60),),
+        1: ((14 * 60, 22 * 60),),
+        2: ((14 * 60, 22 * 60),),
+        3: ((14 * 60, 22 * 60),),
+        4: ((14 * 60, 22 * 60),),
     }
+)
 
-    evening_shift = {
-        0: [(14 * 60, 22 * 60)],
-        1: [(14 * 60, 22 * 60)],
-        2: [(14 * 60, 22 * 60)],
-        3: [(14 * 60, 22 * 60)],
-        4: [(14 * 60, 22 * 60)],
+SPLIT_SHIFT = MappingProxyType(
+    {
+        0: ((9 * 60, 12 * 60), (14 * 60, 18 * 60)),
+        1: ((9 * 60, 12 * 60), (14 * 60, 18 * 60)),
+        2: ((9 * 60, 12 * 60), (14 * 60, 18 * 60)),
+        3: ((9 * 60, 12 * 60), (14 * 60, 18 * 60)),
+        4: ((9 * 60, 12 * 60), (14 * 60, 18 * 60)),
     }
+)
 
-    split_shift = {
-        0: [(9 * 60, 12 * 60), (14 * 60, 18 * 60)],
-        1: [(9 * 60, 12 * 60), (14 * 60, 18 * 60)],
-        2: [(9 * 60, 12 * 60), (14 * 60, 18 * 60)],
-        3: [(9 * 60, 12 * 60), (14 * 60, 18 * 60)],
-        4: [(9 * 60, 12 * 60), (14 * 60, 18 * 60)],
+PART_TIME = MappingProxyType(
+    {
+        1: ((8 * 60, 12 * 60),),  # Tuesday
+        3: ((8 * 60, 12 * 60),),  # Thursday
+        5: ((8 * 60, 12 * 60),),  # Saturday
     }
+)
 
-    part_time = {
-        1: [(8 * 60, 12 * 60)],  # Tuesday
-        3: [(8 * 60, 12 * 60)],  # Thursday
-        5: [(8 * 60, 12 * 60)],  # Saturday
+WEEKEND_ONLY = MappingProxyType(
+    {
+        5: ((10 * 60, 16 * 60),),  # Saturday
+        6: ((10 * 60, 16 * 60),),  # Sunday
     }
+)
 
-    weekend_only = {
-        5: [(10 * 60, 16 * 60)],  # Saturday
-        6: [(10 * 60, 16 * 60)],  # Sunday
+FIXED_WORK_SCHEDULES = MappingProxyType(
+    {
+        "full_time": FULL_TIME,
+        "evening": EVENING_SHIFT,
+        "split": SPLIT_SHIFT,
+        "part_time": PART_TIME,
+        "weekend": WEEKEND_ONLY,
     }
+)
 
-    rotating_24_7 = {}
-    for day in range(7):
-        shift = random.choice(
-            [
-                (0, 8 * 60),  # Midnight to 8am
-                (8 * 60, 16 * 60),  # 8am to 4pm
-                (16 * 60, 24 * 60),  # 4pm to Midnight
-            ]
-        )
-        rotating_24_7[day] = [shift]
+# Shifts that a rotating 24/7 schedule picks from for each day
+ROTATING_SHIFTS = (
+    (0, 8 * 60),  # Midnight to 8am
+    (8 * 60, 16 * 60),  # 8am to 4pm
+    (16 * 60, 24 * 60),  # 4pm to Midnight
+)
 
-    schedules = {
-        "full_time": full_time,
-        "evening": evening_shift,
-        "split": split_shift,
-        "part_time": part_time,
-        "weekend": weekend_only,
-        "rotating": rotating_24_7,
-    }
+SCHEDULE_TYPES = ("full_time", "evening", "split", "part_time", "weekend", "rotating")
+
+
+def sample_practitioner_work_schedule(schedule_type=None):
+    """Return a realistic weekly work schedule as a mapping of daily time blocks."""
 
     if schedule_type is None:
-        schedule_type = random.choice(list(schedules.keys()))
+        schedule_type = random.choice(SCHEDULE_TYPES)
+
+    if schedule_type != "rotating":
+        return FIXED_WORK_SCHEDULES[schedule_type]
 
-    return schedules[schedule_type]
+    return {day: (random.choice(ROTATING_SHIFTS),) for day in range(7)}